@@ -5,14 +5,15 @@ Upload GitHub repos and ask questions about code with AI
 import streamlit as st
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from code_parser import parse_repository, chunk_for_storage
-from embeddings import embed_texts
-from vector_db import get_vector_db, reset_vector_db
+from embeddings import embed_question
+from pipeline import parse_and_embed
+from vector_db import get_vector_db, reset_vector_db, current_repo, set_current_repo
 from rag_handler import get_rag_handler
 from utils import clone_repository, find_python_files, cleanup_repo
 from cache_manager import get_cache
@@ -119,10 +120,19 @@ with st.sidebar:
                         cached_data = cache.load_analysis(repo_url)
                         if cached_data:
                             chunks_dict, embeddings = cached_data
-                            progress_container.info("💾 Restoring to vector database...")
-                            reset_vector_db()
-                            vector_db = get_vector_db()
-                            success = vector_db.add_chunks(chunks_dict, embeddings)
+                            repo_hash = cache.get_repo_hash(repo_url)
+
+                            if current_repo() == repo_hash:
+                                # Index already holds this repo - skip the
+                                # reset + re-upsert entirely
+                                success = True
+                            else:
+                                progress_container.info("💾 Restoring to vector database...")
+                                reset_vector_db()
+                                vector_db = get_vector_db()
+                                success = vector_db.add_chunks(chunks_dict, embeddings, flush=True)
+                                if success:
+                                    set_current_repo(repo_hash)
 
                             if success:
                                 st.session_state.repo_analyzed = True
@@ -157,20 +167,17 @@ with st.sidebar:
                             status_container.error("❌ No Python files found in repository")
                             cleanup_repo(repo_path)
                         else:
-                            # Parse repository
-                            progress_container.info(f"📝 Parsing {len(python_files)} files...")
-                            chunks = parse_repository(repo_path, python_files)
-
-                            if not chunks:
+                            # Parse and embed concurrently: chunks stream
+                            # from the parser into the embedder (with the
+                            # content-addressed cache skipping unchanged
+                            # chunks) instead of running phase by phase
+                            progress_container.info(f"📝 Parsing and embedding {len(python_files)} files...")
+                            chunks_dict, embeddings = parse_and_embed(python_files, cache)
+
+                            if not chunks_dict:
                                 status_container.error("❌ Could not extract code chunks")
                                 cleanup_repo(repo_path)
                             else:
-                                # Create embeddings
-                                progress_container.info("🧠 Generating embeddings...")
-                                chunks_dict = [chunk_for_storage(chunk) for chunk in chunks]
-                                texts = [c['combined_text'] for c in chunks_dict]
-                                embeddings = embed_texts(texts)
-
                                 # Filter valid pairs
                                 valid_pairs = [
                                     (chunk, emb) for chunk, emb in zip(chunks_dict, embeddings)
@@ -186,9 +193,11 @@ with st.sidebar:
                                     vector_db = get_vector_db()
                                     valid_chunks = [p[0] for p in valid_pairs]
                                     valid_embeddings = [p[1] for p in valid_pairs]
-                                    success = vector_db.add_chunks(valid_chunks, valid_embeddings)
+                                    success = vector_db.add_chunks(valid_chunks, valid_embeddings, flush=True)
 
                                     if success:
+                                        set_current_repo(cache.get_repo_hash(repo_url))
+
                                         # SAVE TO CACHE for future analysis
                                         progress_container.info("💾 Saving to cache...")
                                         cache.save_analysis(repo_url, valid_chunks, valid_embeddings)
@@ -234,14 +243,17 @@ if st.session_state.repo_analyzed:
 
     if search and question.strip():
         try:
-            # Embed question
-            question_embedding = embed_texts([question])[0]
+            # Embed question in the background (memoized for repeats)
+            # while the vector DB connection warms up
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                embed_future = executor.submit(embed_question, question)
+                vector_db = get_vector_db()
+                question_embedding = embed_future.result()
 
             if question_embedding is None:
                 st.error("❌ Could not embed question")
             else:
                 # Search vector DB
-                vector_db = get_vector_db()
                 results = vector_db.search(question_embedding, top_k=20)
 
                 if not results:
@@ -3,19 +3,44 @@ Cache Manager - Handle persistent storage of analyzed repositories
 Enables 600x faster re-analysis of same repositories
 Includes TTL (Time-To-Live) + Git commit hash validation for cache freshness
 """
+import functools
+import gzip
 import hashlib
 import json
 import os
+import pickle
+import shutil
 import subprocess
 from pathlib import Path
 from typing import Optional, List
-from datetime import datetime, timedelta
+from datetime import datetime
+
+import numpy as np
+
+from embeddings import get_model_id
 
 try:
     import requests
 except ImportError:
     requests = None
 
+try:
+    # C-implemented JSON serializer - ~5-10x faster than stdlib json
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+@functools.lru_cache(maxsize=128)
+def _hash_url(repo_url: str) -> str:
+    """Memoized URL hash - the same URL is hashed on every cache call"""
+    return hashlib.sha256(repo_url.encode()).hexdigest()[:16]
+
 
 class RepositoryCache:
     """Manage cached analysis of repositories"""
@@ -27,7 +52,51 @@ class RepositoryCache:
 
     def get_repo_hash(self, repo_url: str) -> str:
         """Generate unique hash for repository URL"""
-        return hashlib.sha256(repo_url.encode()).hexdigest()[:16]
+        return _hash_url(repo_url)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Content hash for a chunk's embedding text
+
+        Scoped to the active embedding model - cached vectors from one
+        model must never be served alongside another's, the same way
+        the AST cache key carries the interpreter version.
+        """
+        payload = f"{get_model_id()}\x00{text}".encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _embedding_shard_path(self, text_hash: str) -> Path:
+        """Path of the per-chunk embedding shard for a content hash"""
+        return self.cache_dir / "embeddings" / text_hash[:2] / f"{text_hash}.npy"
+
+    def get_embeddings_by_hash(self, hashes: List[str]) -> list:
+        """
+        Look up per-chunk embeddings by content hash
+
+        Returns one entry per hash: the cached float32 vector, or None for
+        chunks that still need embedding. Content addressing means a small
+        edit only re-embeds the chunks it actually touched.
+        """
+        embeddings = []
+        for text_hash in hashes:
+            shard = self._embedding_shard_path(text_hash)
+            try:
+                embeddings.append(np.load(shard) if shard.exists() else None)
+            except Exception:
+                embeddings.append(None)
+        return embeddings
+
+    def save_embeddings_by_hash(self, hashes: List[str], embeddings: list) -> None:
+        """Store per-chunk embeddings under their content hashes"""
+        for text_hash, embedding in zip(hashes, embeddings):
+            if embedding is None:
+                continue
+            try:
+                shard = self._embedding_shard_path(text_hash)
+                shard.parent.mkdir(parents=True, exist_ok=True)
+                np.save(shard, np.asarray(embedding, dtype=np.float32))
+            except Exception as e:
+                print(f"Error saving embedding shard: {e}")
 
     def get_current_commit_hash(self) -> Optional[str]:
         """Get current Git commit hash for cache versioning"""
@@ -73,11 +142,36 @@ class RepositoryCache:
             print(f"DEBUG: Exception getting commit: {e}")
             return None
 
+    @staticmethod
+    def _read_json(path: Path) -> dict:
+        """Read a JSON file, using orjson when available"""
+        if orjson:
+            return orjson.loads(path.read_bytes())
+        with open(path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: Path, data: dict) -> None:
+        """Write a JSON file, using orjson when available"""
+        if orjson:
+            path.write_bytes(orjson.dumps(data))
+        else:
+            with open(path, "w") as f:
+                json.dump(data, f)
+
+    def _cache_paths(self, repo_url: str) -> tuple[Path, Path, Path]:
+        """Get the three cache file paths (meta, chunks, embeddings) for a repo"""
+        repo_hash = self.get_repo_hash(repo_url)
+        return (
+            self.cache_dir / f"{repo_hash}.meta.json",
+            self.cache_dir / f"{repo_hash}.chunks.pkl",
+            self.cache_dir / f"{repo_hash}.emb.npz",
+        )
+
     def is_cached(self, repo_url: str) -> bool:
         """Check if repository analysis is cached"""
-        repo_hash = self.get_repo_hash(repo_url)
-        cache_file = self.cache_dir / f"{repo_hash}.json"
-        return cache_file.exists()
+        meta_file, chunks_file, emb_file = self._cache_paths(repo_url)
+        return meta_file.exists() and chunks_file.exists() and emb_file.exists()
 
     def is_cache_valid(self, repo_url: str, ttl_hours: int = 24) -> bool:
         """
@@ -91,21 +185,23 @@ class RepositoryCache:
             True if cache exists and is fresh, False otherwise
         """
         try:
-            repo_hash = self.get_repo_hash(repo_url)
-            cache_file = self.cache_dir / f"{repo_hash}.json"
+            meta_file, _, _ = self._cache_paths(repo_url)
 
-            if not cache_file.exists():
+            if not meta_file.exists():
                 return False
 
-            with open(cache_file, "r") as f:
-                cache_data = json.load(f)
+            cache_data = self._read_json(meta_file)
 
-            # Check TTL (Time-To-Live)
-            cache_timestamp = datetime.fromisoformat(cache_data.get("timestamp", ""))
-            age = datetime.now() - cache_timestamp
-            if age > timedelta(hours=ttl_hours):
+            # Check TTL (Time-To-Live) - timestamp stored as epoch seconds
+            age_seconds = datetime.now().timestamp() - float(cache_data.get("timestamp", 0))
+            if age_seconds > ttl_hours * 3600:
                 return False  # Cache expired
 
+            # Reject caches embedded with a different model - the
+            # vectors would come from an incompatible space
+            if cache_data.get("embedding_model") != get_model_id():
+                return False
+
             # Check if ANALYZED REPO's Git commit has changed (FIXED)
             cached_commit = cache_data.get("commit_hash")
             current_commit = self.get_github_repo_commit(repo_url)
@@ -125,61 +221,102 @@ class RepositoryCache:
             return False
 
     def save_analysis(self, repo_url: str, chunks: List[dict], embeddings: List[List[float]]) -> bool:
-        """Save analyzed chunks and embeddings to cache with versioning"""
+        """
+        Save analyzed chunks and embeddings to cache with versioning
+
+        Chunks are pickled (protocol 5). Embeddings are scalar-quantized to
+        int8 with a per-vector scale (SQ8) - 4x smaller than float32, which
+        matters on this bandwidth-bound load path.
+        """
         try:
-            repo_hash = self.get_repo_hash(repo_url)
-            cache_file = self.cache_dir / f"{repo_hash}.json"
+            meta_file, chunks_file, emb_file = self._cache_paths(repo_url)
 
-            cache_data = {
+            meta = {
                 "repo_url": repo_url,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": datetime.now().timestamp(),
                 "commit_hash": self.get_github_repo_commit(repo_url),  # FIXED: Get ANALYZED repo's commit
                 "chunks_count": len(chunks),
-                "chunks": chunks,
-                "embeddings": embeddings,
+                "quantized": True,
+                "embedding_model": get_model_id(),
             }
 
-            with open(cache_file, "w") as f:
-                json.dump(cache_data, f)
+            # Chunk text compresses ~5x; this path is disk-bandwidth-bound
+            # so the compression pays for itself
+            if zstandard:
+                with open(chunks_file, "wb") as raw:
+                    with zstandard.ZstdCompressor(level=3).stream_writer(raw) as f:
+                        pickle.dump(chunks, f, protocol=5)
+            else:
+                with gzip.open(chunks_file, "wb") as f:
+                    pickle.dump(chunks, f, protocol=5)
+
+            emb = np.asarray(embeddings, dtype=np.float32)
+            scale = np.max(np.abs(emb), axis=1, keepdims=True) / 127.0
+            scale[scale == 0] = 1.0  # All-zero vectors quantize to zero as-is
+            q = np.round(emb / scale).astype(np.int8)
+            np.savez_compressed(emb_file, q=q, scale=scale.astype(np.float16))
+
+            # Write metadata last so a partial cache is never seen as complete
+            self._write_json(meta_file, meta)
 
             return True
         except Exception as e:
             print(f"Error saving cache: {e}")
             return False
 
-    def load_analysis(self, repo_url: str) -> Optional[tuple[List[dict], List[List[float]]]]:
-        """Load cached chunks and embeddings (validates freshness first)"""
+    def load_analysis(self, repo_url: str) -> Optional[tuple[List[dict], np.ndarray]]:
+        """
+        Load cached chunks and embeddings (validates freshness first)
+
+        Embeddings are dequantized back to a float32 array (int8 * scale) -
+        still no per-float text parsing on this path.
+        """
         try:
             # NEW: Check if cache is still valid (TTL + commit hash)
             if not self.is_cache_valid(repo_url):
                 return None
 
-            repo_hash = self.get_repo_hash(repo_url)
-            cache_file = self.cache_dir / f"{repo_hash}.json"
+            _, chunks_file, emb_file = self._cache_paths(repo_url)
 
-            with open(cache_file, "r") as f:
-                cache_data = json.load(f)
+            chunks = self._load_chunks(chunks_file)
 
-            chunks = cache_data.get("chunks", [])
-            embeddings = cache_data.get("embeddings", [])
+            with np.load(emb_file) as data:
+                embeddings = data["q"].astype(np.float32) * data["scale"].astype(np.float32)
 
             return chunks, embeddings
         except Exception as e:
             print(f"Error loading cache: {e}")
             return None
 
+    @staticmethod
+    def _load_chunks(chunks_file: Path) -> List[dict]:
+        """Load the pickled chunk list, sniffing the compression format"""
+        with open(chunks_file, "rb") as f:
+            magic = f.read(4)
+            f.seek(0)
+            if magic.startswith(b"\x28\xb5\x2f\xfd") and zstandard:
+                with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                    return pickle.load(reader)
+            if magic.startswith(b"\x1f\x8b"):
+                with gzip.open(f) as reader:
+                    return pickle.load(reader)
+            # Uncompressed pickle from an earlier cache version
+            return pickle.load(f)
+
     def clear_cache(self, repo_url: Optional[str] = None) -> bool:
         """Clear cache for specific repo or all repos"""
         try:
             if repo_url:
-                repo_hash = self.get_repo_hash(repo_url)
-                cache_file = self.cache_dir / f"{repo_hash}.json"
-                if cache_file.exists():
-                    cache_file.unlink()
+                for cache_file in self._cache_paths(repo_url):
+                    if cache_file.exists():
+                        cache_file.unlink()
             else:
-                # Clear all caches
-                for cache_file in self.cache_dir.glob("*.json"):
-                    cache_file.unlink()
+                # Clear all caches (including legacy single-file .json format)
+                for pattern in ("*.meta.json", "*.chunks.pkl", "*.emb.npz", "*.json"):
+                    for cache_file in self.cache_dir.glob(pattern):
+                        cache_file.unlink()
+                # Per-chunk embedding shards
+                shutil.rmtree(self.cache_dir / "embeddings", ignore_errors=True)
             return True
         except Exception as e:
             print(f"Error clearing cache: {e}")
@@ -187,11 +324,15 @@ class RepositoryCache:
 
     def get_cache_stats(self) -> dict:
         """Get cache statistics"""
-        cache_files = list(self.cache_dir.glob("*.json"))
+        meta_files = list(self.cache_dir.glob("*.meta.json"))
+        cache_files = [
+            f for pattern in ("*.meta.json", "*.chunks.pkl", "*.emb.npz")
+            for f in self.cache_dir.glob(pattern)
+        ]
         total_size = sum(f.stat().st_size for f in cache_files) / (1024 * 1024)  # MB
 
         return {
-            "total_cached_repos": len(cache_files),
+            "total_cached_repos": len(meta_files),
             "total_size_mb": round(total_size, 2),
             "cache_dir": str(self.cache_dir),
         }
@@ -2,7 +2,13 @@
 Code Parser - Extract functions and classes from Python code using AST
 """
 import ast
+import hashlib
+import mmap
 import os
+import shelve
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
 from typing import NamedTuple, Optional
 
 
@@ -19,18 +25,39 @@ class CodeChunk(NamedTuple):
     class_name: str = ""  # Empty for module-level functions, set for methods
 
 
-def read_file_with_encoding(file_path: str) -> Optional[str]:
-    """Read file with error handling for encoding"""
+def _read_file_bytes(file_path: str) -> Optional[bytes]:
+    """Read file contents via mmap (plain read for empty/unmappable files)"""
+    try:
+        with open(file_path, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return bytes(mm)
+            except ValueError:
+                # Zero-length files cannot be mapped
+                return f.read()
+    except OSError:
+        return None
+
+
+def _decode_bytes(raw: bytes) -> Optional[str]:
+    """Decode file bytes with error handling for encoding"""
     encodings = ['utf-8', 'latin-1', 'cp1252']
     for encoding in encodings:
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                return f.read()
-        except (UnicodeDecodeError, FileNotFoundError):
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
             continue
     return None
 
 
+def read_file_with_encoding(file_path: str) -> Optional[str]:
+    """Read file with error handling for encoding"""
+    raw = _read_file_bytes(file_path)
+    if raw is None:
+        return None
+    return _decode_bytes(raw)
+
+
 def extract_docstring(node: ast.AST) -> str:
     """Extract docstring from AST node"""
     docstring = ast.get_docstring(node)
@@ -41,50 +68,79 @@ def extract_chunks(file_path: str) -> list[CodeChunk]:
     """Extract all functions and methods from a Python file - METHOD LEVEL GRANULARITY"""
     chunks = []
 
-    # Read file
-    content = read_file_with_encoding(file_path)
-    if content is None:
+    # Read file as bytes; ast.parse handles PEP 263 encoding declarations
+    # itself, so no decode is needed just to parse
+    raw = _read_file_bytes(file_path)
+    if raw is None:
         return chunks
 
     # Parse AST
     try:
-        tree = ast.parse(content)
-    except SyntaxError:
-        # Skip files with syntax errors
+        tree = ast.parse(raw)
+    except (SyntaxError, ValueError):
+        # Skip files with syntax errors (or null bytes)
         return chunks
 
-    # Extract line numbers for each node
-    source_lines = content.split('\n')
-    relative_path = file_path.replace('\\', '/')
-
-    # Process module-level items
+    # Collect target defs first (tree.body only - nested defs stay part
+    # of their enclosing chunk) so files without any can skip the decode
+    targets = []
     for node in tree.body:
-        if isinstance(node, ast.FunctionDef):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
             # Module-level function
-            chunk = _create_chunk(node, relative_path, source_lines, class_name="")
-            if chunk:
-                chunks.append(chunk)
+            targets.append((node, ""))
 
         elif isinstance(node, ast.ClassDef):
             # Class-level methods (extract each method separately)
-            class_name = node.name
-
             for method in node.body:
-                if isinstance(method, ast.FunctionDef):
-                    chunk = _create_chunk(method, relative_path, source_lines, class_name=class_name)
-                    if chunk:
-                        chunks.append(chunk)
+                if isinstance(method, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    targets.append((method, node.name))
+
+    if not targets:
+        return chunks
+
+    # Decode once for source extraction
+    content = _decode_bytes(raw)
+    if content is None:
+        return chunks
+
+    # Precompute line-start offsets once so each chunk is a single slice
+    # of content rather than a split + join over the whole file; str.find
+    # scans at C speed instead of a per-character Python loop
+    line_starts = [0]
+    pos = content.find('\n')
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = content.find('\n', pos + 1)
+    relative_path = file_path.replace('\\', '/')
+
+    for node, class_name in targets:
+        chunk = _create_chunk(node, relative_path, content, line_starts, class_name=class_name)
+        if chunk:
+            chunks.append(chunk)
 
     return chunks
 
 
-def _create_chunk(node: ast.FunctionDef, file_path: str, source_lines: list, class_name: str = "") -> Optional[CodeChunk]:
+def _make_chunk_id(file_path: str, name: str, start_line: int, class_name: str = "") -> str:
+    """Unique chunk ID - path-qualified so identical files stay distinct"""
+    if class_name:
+        return f"{file_path}_{class_name}_{name}_{start_line}"
+    return f"{file_path}_{name}_{start_line}"
+
+
+def _create_chunk(node: ast.FunctionDef, file_path: str, content: str, line_starts: list[int], class_name: str = "") -> Optional[CodeChunk]:
     """Create a CodeChunk from a function/method node"""
     start_line = node.lineno
     end_line = node.end_lineno if node.end_lineno else start_line
 
-    # Extract source code
-    source_code = '\n'.join(source_lines[start_line - 1:end_line])
+    # Extract source code as one slice via the precomputed line offsets
+    # (excluding the trailing newline, like the old split/join did)
+    start = line_starts[start_line - 1]
+    if end_line < len(line_starts):
+        end = line_starts[end_line] - 1
+    else:
+        end = len(content)
+    source_code = content[start:end]
 
     # Limit chunk size (truncate if too large)
     if len(source_code) > 5000:
@@ -94,10 +150,7 @@ def _create_chunk(node: ast.FunctionDef, file_path: str, source_lines: list, cla
     chunk_type = "method" if class_name else "function"
 
     # Create unique ID
-    if class_name:
-        chunk_id = f"{file_path}_{class_name}_{node.name}_{start_line}"
-    else:
-        chunk_id = f"{file_path}_{node.name}_{start_line}"
+    chunk_id = _make_chunk_id(file_path, node.name, start_line, class_name)
 
     # Create chunk
     chunk = CodeChunk(
@@ -115,27 +168,153 @@ def _create_chunk(node: ast.FunctionDef, file_path: str, source_lines: list, cla
     return chunk
 
 
+# Vendored / generated paths that cost parse time without producing
+# useful chunks, and a size cap for machine-generated monsters
+_EXCLUDE_PATH_PARTS = ('/vendor/', '/site-packages/', '/test_data/', '_pb2.py')
+_MAX_FILE_SIZE = 512_000  # bytes
+
+
+def _should_parse(file_path: str) -> bool:
+    """Filter out vendored, oversized, and definition-free files"""
+    normalized = file_path.replace('\\', '/')
+    if any(part in normalized for part in _EXCLUDE_PATH_PARTS):
+        return False
+
+    try:
+        if os.stat(file_path).st_size > _MAX_FILE_SIZE:
+            return False
+        # A file whose head has no def/class rarely yields chunks
+        with open(file_path, 'rb') as f:
+            head = f.read(4096)
+    except OSError:
+        return False
+
+    return b'def ' in head or b'class ' in head
+
+
+# Persistent per-file chunk cache so unchanged files skip ast.parse
+# entirely on re-analysis
+_ast_cache = None
+
+
+def _get_ast_cache():
+    """Open (once) the on-disk chunk cache; degrade to a dict on failure"""
+    global _ast_cache
+    if _ast_cache is None:
+        try:
+            cache_dir = Path(".claude_cache")
+            cache_dir.mkdir(exist_ok=True)
+            _ast_cache = shelve.open(str(cache_dir / "ast_cache"), "c", protocol=5)
+        except Exception as e:
+            print(f"Warning: could not open AST cache: {e}")
+            _ast_cache = {}
+    return _ast_cache
+
+
+def _file_cache_key(file_path: str) -> Optional[str]:
+    """Cache key for a file's parsed chunks
+
+    Keyed by content hash (plus interpreter version, since the AST can
+    change between releases) rather than path/mtime - clones land in a
+    fresh temp dir with fresh mtimes on every analysis, so only content
+    addressing actually hits across runs.
+    """
+    raw = _read_file_bytes(file_path)
+    if raw is None:
+        return None
+    digest = hashlib.sha256(raw).hexdigest()
+    return f"{digest}:py{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def _rebind_chunks(chunks: list[CodeChunk], file_path: str) -> list[CodeChunk]:
+    """Re-point cached chunks at the file they were requested for
+
+    Cache entries are shared by content hash, so byte-identical files
+    (vendored copies, templates) hit the same entry - but ids and
+    file_path must reflect THIS file, or identical files alias each
+    other in the index and attributions point at the wrong path.
+    """
+    relative_path = file_path.replace('\\', '/')
+    rebound = []
+    for chunk in chunks:
+        if chunk.file_path == relative_path:
+            rebound.append(chunk)
+        else:
+            rebound.append(chunk._replace(
+                id=_make_chunk_id(relative_path, chunk.name, chunk.start_line, chunk.class_name),
+                file_path=relative_path,
+            ))
+    return rebound
+
+
+def iter_parsed_files(python_files: list[str]):
+    """Yield per-file chunk lists as parsing completes
+
+    Vendored/oversized files are filtered out first. Files already in
+    the on-disk chunk cache are served from it; only misses are parsed,
+    spread across all cores with a process pool (small sets stay serial
+    to avoid worker startup cost). Cache reads/writes happen in this
+    process only - shelve is not safe to share with pool workers.
+    """
+    python_files = [fp for fp in python_files if _should_parse(fp)]
+    cache = _get_ast_cache()
+
+    misses = []
+    miss_keys = []
+    for file_path in python_files:
+        key = _file_cache_key(file_path)
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            # Hits may come from a different path with the same bytes -
+            # rebind ids/file_path to this occurrence
+            yield _rebind_chunks(cached, file_path)
+        else:
+            misses.append(file_path)
+            miss_keys.append(key)
+
+    if len(misses) < 8:
+        results = map(extract_chunks, misses)
+        for key, chunks in zip(miss_keys, results):
+            if key:
+                cache[key] = chunks
+            yield chunks
+        return
+
+    # Threads for small sets (overlaps file I/O without fork cost),
+    # processes once the CPU-bound ast.parse work dominates
+    if len(misses) < 32:
+        executor_cls, map_kwargs = ThreadPoolExecutor, {}
+    else:
+        executor_cls, map_kwargs = ProcessPoolExecutor, {"chunksize": 16}
+
+    with executor_cls(max_workers=os.cpu_count()) as executor:
+        for key, chunks in zip(miss_keys, executor.map(extract_chunks, misses, **map_kwargs)):
+            if key:
+                cache[key] = chunks
+            yield chunks
+
+
 def parse_repository(root_path: str, python_files: list[str]) -> list[CodeChunk]:
     """Parse all Python files and extract code chunks"""
     all_chunks = []
-
-    for file_path in python_files:
-        chunks = extract_chunks(file_path)
+    for chunks in iter_parsed_files(python_files):
         all_chunks.extend(chunks)
-
     return all_chunks
 
 
 def chunk_for_storage(chunk: CodeChunk) -> dict:
     """Convert CodeChunk to dictionary for storage with class context for semantic search"""
 
-    # Build combined text with class context for better semantic search
+    # Build combined text with class context for better semantic search.
+    # The transformer truncates input at 512 tokens (~1500 chars), so
+    # anything past that would be tokenized and hashed for nothing - the
+    # full source_code stays in the stored dict.
     if chunk.class_name:
         # Method: include class name for context
-        combined_text = f"{chunk.class_name}.{chunk.name} {chunk.docstring}\n{chunk.source_code}"
+        combined_text = f"{chunk.class_name}.{chunk.name} {chunk.docstring[:400]}\n{chunk.source_code[:1500]}"
     else:
         # Module-level function
-        combined_text = f"{chunk.name} {chunk.docstring}\n{chunk.source_code}"
+        combined_text = f"{chunk.name} {chunk.docstring[:400]}\n{chunk.source_code[:1500]}"
 
     return {
         "id": chunk.id,
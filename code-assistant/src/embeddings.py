@@ -2,9 +2,46 @@
 Embeddings Generator - Create embeddings for code chunks
 Uses sentence-transformers for efficient, free embeddings
 """
+import functools
+import os
+from pathlib import Path
 from typing import Optional
 import numpy as np
 
+# Micro-batch size for encoder forwards - 64 saturates BLAS/CUDA on the
+# MiniLM model without wasting memory on padding
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+try:
+    # Keep the model resident across Streamlit script reruns
+    from streamlit import cache_resource as _cache_resource
+except ImportError:
+    _cache_resource = functools.lru_cache(maxsize=None)
+
+
+class Model2VecBackend:
+    """
+    Static-embedding backend (model2vec) behind the model.encode interface
+
+    Embedding collapses to token-id lookups + mean pool + L2 norm, which
+    is ~20-40x faster than a transformer forward on CPU at modest recall
+    loss - a reasonable trade for a code-search prefilter. Enabled with
+    EMBED_BACKEND=static.
+    """
+
+    def __init__(self, model_name: str = "minishlab/potion-base-8M"):
+        from model2vec import StaticModel
+        self.static_model = StaticModel.from_pretrained(model_name)
+        self.model_name = model_name
+        self.dimension = self.static_model.dim
+
+    def encode(self, texts, **kwargs):
+        """Encode text(s) to L2-normalized vectors (encode-kwargs ignored)"""
+        embeddings = np.asarray(self.static_model.encode(texts), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
 
 class EmbeddingsGenerator:
     """Generate embeddings for code chunks using sentence-transformers"""
@@ -13,19 +50,105 @@ class EmbeddingsGenerator:
         """Initialize embeddings generator"""
         self.model = None
         self.dimension = None
+        self.device = "cpu"
+        self._torch = None
+        # Identity of whatever backend actually activated - cache keys
+        # are scoped to it so vectors from different embedding spaces
+        # never mix
+        self.model_id = "fallback"
 
     def initialize(self):
         """Lazy load model to avoid import issues"""
+        if os.getenv("EMBED_BACKEND", "").lower() == "static":
+            try:
+                backend = Model2VecBackend(
+                    os.getenv("STATIC_EMBED_MODEL", "minishlab/potion-base-8M")
+                )
+                if backend.dimension != 384:
+                    # The Endee index and add_chunks validation are
+                    # hard-wired to 384 - a mismatched backend could
+                    # never index anything, so refuse it outright
+                    print(f"Warning: static model is {backend.dimension}-dim but the "
+                          "vector index expects 384; ignoring EMBED_BACKEND=static")
+                else:
+                    self.model = backend
+                    self.dimension = backend.dimension
+                    self.model_id = f"static:{backend.model_name}"
+                    return
+            except Exception as e:
+                print(f"Warning: static embedding backend unavailable: {e}")
+
         try:
+            import torch
             from sentence_transformers import SentenceTransformer
+
+            self._torch = torch
+            # GPU with FP16 weights is 10-30x faster for the analyze phase
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+            if self.device == "cpu":
+                # On CPU, an INT8-quantized ONNX model roughly doubles
+                # MatMul throughput (VNNI) at ~4x smaller size
+                model = self._load_onnx_int8()
+                if model is not None:
+                    self.model = model
+                    self.dimension = 384
+                    self.model_id = "all-MiniLM-L6-v2"
+                    return
+
             # Using a small, fast model suitable for code
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = SentenceTransformer('all-MiniLM-L6-v2', device=self.device)
+            if self.device == "cuda":
+                self.model.half()
             self.dimension = 384  # Model dimension
+            self.model_id = "all-MiniLM-L6-v2"
         except Exception as e:
             print(f"Warning: Could not load embeddings model: {e}")
             self.model = None
 
-    def embed_text(self, text: str) -> Optional[list[float]]:
+    @staticmethod
+    def _load_onnx_int8():
+        """
+        Load MiniLM via ONNX Runtime with dynamic INT8 quantization
+
+        The quantized model is exported once into a local cache dir and
+        reloaded from there on later runs. Returns None when the ONNX
+        stack (optimum/onnxruntime) isn't available.
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+            from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+            quant_dir = Path.home() / ".cache" / "code-assistant" / "all-MiniLM-L6-v2-onnx-int8"
+            file_name = "onnx/model_qint8_avx512_vnni.onnx"
+
+            if not (quant_dir / file_name).exists():
+                model = SentenceTransformer('all-MiniLM-L6-v2', backend="onnx")
+                export_dynamic_quantized_onnx_model(
+                    model, "avx512_vnni", str(quant_dir)
+                )
+
+            return SentenceTransformer(
+                str(quant_dir),
+                backend="onnx",
+                model_kwargs={"file_name": file_name},
+            )
+        except Exception as e:
+            print(f"Warning: ONNX INT8 backend unavailable, using PyTorch: {e}")
+            return None
+
+    def _encode(self, texts, **kwargs):
+        """Run model.encode under inference mode (and FP16 autocast on GPU)"""
+        if self._torch is None:
+            return self.model.encode(texts, **kwargs)
+
+        with self._torch.inference_mode():
+            if self.device == "cuda":
+                with self._torch.autocast("cuda", dtype=self._torch.float16):
+                    return self.model.encode(texts, **kwargs)
+            return self.model.encode(texts, **kwargs)
+
+    def embed_text(self, text: str) -> Optional[np.ndarray]:
         """
         Generate embedding for a single text
 
@@ -33,35 +156,85 @@ class EmbeddingsGenerator:
             text: Text to embed
 
         Returns:
-            Embedding vector or None if model not available
+            float16 embedding vector or None if model not available
         """
         if self.model is None:
             self.initialize()
 
         if self.model is None:
-            # Fallback: return random embedding (for testing)
-            return [0.1] * 384
+            # Fallback: return constant embedding (for testing)
+            return np.full(384, 0.1, dtype=np.float16)
 
         try:
             if not text or not text.strip():
                 print("[WARNING] Empty text passed to embed_text, returning zeros")
-                return [0.0] * 384
+                return np.zeros(384, dtype=np.float16)
 
-            embedding = self.model.encode(text, convert_to_tensor=False)
-            result = embedding.tolist() if hasattr(embedding, 'tolist') else embedding
+            embedding = np.asarray(self._encode(text, convert_to_tensor=False))
 
             # Check for NaN values
-            if any(isinstance(v, float) and np.isnan(v) for v in result):
+            if np.isnan(embedding).any():
                 print(f"[ERROR] Embedding contains NaN values for text: {text[:50]}...")
                 return None
 
-            return result
+            return embedding.astype(np.float16)
         except Exception as e:
             print(f"[ERROR] Could not embed text: {e}")
             print(f"[DEBUG] Text sample: {text[:100]}...")
             return None
 
-    def embed_texts(self, texts: list[str]) -> list[Optional[list[float]]]:
+    def tokenize_text(self, text: str) -> Optional[list[int]]:
+        """Tokenize a text once, for later embedding via embed_pretokenized"""
+        if self.model is None:
+            self.initialize()
+        if self.model is None:
+            return None
+
+        try:
+            return self.model.tokenizer(
+                text, truncation=True, max_length=512
+            )["input_ids"]
+        except Exception as e:
+            # e.g. the static backend has no tokenizer
+            print(f"Warning: tokenizer unavailable: {e}")
+            return None
+
+    def embed_pretokenized(self, token_ids: list[list[int]]) -> list[Optional[list[float]]]:
+        """
+        Embed pre-tokenized inputs, skipping the per-call tokenizer pass
+
+        Useful when token ids are produced (and cached) ahead of time;
+        the transformer forward runs on padded id tensors directly.
+        """
+        if self.model is None:
+            self.initialize()
+        if self.model is None:
+            return [[0.1] * 384 for _ in token_ids]
+
+        try:
+            features = self.model.tokenizer.pad(
+                {"input_ids": [ids[:512] for ids in token_ids]},
+                padding=True,
+                return_tensors="pt",
+            )
+            features = {k: v.to(self.device) for k, v in features.items()}
+
+            with self._torch.inference_mode(), self._torch.amp.autocast(
+                "cuda", dtype=self._torch.float16,
+                enabled=self.device == "cuda",
+            ):
+                out = self.model(features)
+
+            embeddings = out["sentence_embedding"].float().cpu().numpy()
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings = embeddings / norms
+            return [e.tolist() for e in embeddings]
+        except Exception as e:
+            print(f"Warning: Could not embed pre-tokenized inputs: {e}")
+            return [None] * len(token_ids)
+
+    def embed_texts(self, texts: list[str]):
         """
         Generate embeddings for multiple texts
 
@@ -69,42 +242,86 @@ class EmbeddingsGenerator:
             texts: List of texts to embed
 
         Returns:
-            List of embedding vectors
+            One contiguous (N, dim) float16 array - callers iterate rows
+            or slice it directly. On total failure, a list of None
+            entries (one per text) like before.
+
+        A single matrix instead of N separate row arrays keeps the batch
+        cache-friendly and avoids a Python object per chunk.
         """
         if self.model is None:
             self.initialize()
 
         if self.model is None:
             # Fallback
-            return [[0.1] * 384 for _ in texts]
+            return np.full((len(texts), 384), 0.1, dtype=np.float16)
 
         try:
-            embeddings = self.model.encode(texts, convert_to_tensor=False)
-            return [e.tolist() if hasattr(e, 'tolist') else e for e in embeddings]
+            # Smart batching: sort by length so each micro-batch wastes
+            # as little padding as possible, then restore input order
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i].split()))
+            encoded = self._encode(
+                [texts[i] for i in order],
+                batch_size=EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+
+            results = np.empty((len(texts), encoded.shape[1]), dtype=np.float16)
+            for pos, i in enumerate(order):
+                results[i] = encoded[pos]
+            return results
         except Exception as e:
             print(f"Warning: Could not embed texts: {e}")
             return [None] * len(texts)
 
 
-# Global embeddings generator
-_embeddings_gen = None
+@_cache_resource
+def get_embeddings_generator() -> EmbeddingsGenerator:
+    """Get or create the shared embeddings generator
 
+    Cached via st.cache_resource under Streamlit (survives script
+    reruns and is shared across sessions), lru_cache otherwise.
+    """
+    generator = EmbeddingsGenerator()
+    generator.initialize()
+    return generator
 
-def get_embeddings_generator() -> EmbeddingsGenerator:
-    """Get or create global embeddings generator"""
-    global _embeddings_gen
-    if _embeddings_gen is None:
-        _embeddings_gen = EmbeddingsGenerator()
-        _embeddings_gen.initialize()
-    return _embeddings_gen
 
+def get_model_id() -> str:
+    """Identity of the active embedding model, for cache keying
 
-def embed_text(text: str) -> Optional[list[float]]:
+    Vectors from different models live in incompatible spaces; anything
+    that caches embeddings must scope its keys by this.
+    """
+    return get_embeddings_generator().model_id
+
+
+def embed_text(text: str) -> Optional[np.ndarray]:
     """Convenience function to embed a single text"""
     return get_embeddings_generator().embed_text(text)
 
 
-def embed_texts(texts: list[str]) -> list[Optional[list[float]]]:
+def embed_texts(texts: list[str]):
     """Convenience function to embed multiple texts"""
     return get_embeddings_generator().embed_texts(texts)
+
+
+@functools.lru_cache(maxsize=512)
+def _embed_question_cached(text: str) -> Optional[tuple]:
+    """Memoized single-text embedding (tuple so lru_cache can store it)"""
+    result = get_embeddings_generator().embed_text(text)
+    return tuple(result) if result is not None else None
+
+
+def embed_question(text: str) -> Optional[list[float]]:
+    """
+    Embed a user question with memoization
+
+    Repeated or identical questions skip the transformer forward pass
+    entirely - common in interactive sessions.
+    """
+    cached = _embed_question_cached(text)
+    return list(cached) if cached is not None else None
 #CHECKING IF GITHUB API WORDS FOR OLD COMMITS
@@ -12,8 +12,9 @@ from typing import Optional
 sys.path.insert(0, os.path.dirname(__file__))
 
 from utils import clone_repository, find_python_files, cleanup_repo
-from code_parser import parse_repository, chunk_for_storage
-from embeddings import embed_texts
+from cache_manager import get_cache
+from embeddings import embed_texts, get_embeddings_generator
+from pipeline import parse_embed_index
 from vector_db import get_vector_db, reset_vector_db
 from rag_handler import get_rag_handler
 
@@ -66,6 +67,25 @@ class QueryResponse(BaseModel):
 
 
 # Endpoints
+@app.on_event("startup")
+async def warm_up():
+    """Load the embedding model and Gemini client before the first request
+
+    Lazy init would otherwise add seconds of model-load latency to the
+    first /analyze and /query.
+    """
+    try:
+        import torch
+        torch.set_num_threads(os.cpu_count())
+        torch.set_grad_enabled(False)  # Inference only
+    except ImportError:
+        pass
+
+    get_embeddings_generator()
+    get_rag_handler()
+    embed_texts(["warmup"])
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -108,67 +128,34 @@ async def analyze_repository(request: AnalyzeRequest):
                 error="No Python files found in repository"
             )
 
-        # Parse repository
-        chunks = parse_repository(repo_path, python_files)
-        if not chunks:
-            cleanup_repo(repo_path)
-            return AnalyzeResponse(
-                status="error",
-                chunks_count=0,
-                error="No code chunks could be extracted"
-            )
-
-        current_repo_info["status"] = "embedding"
-
-        # Convert chunks to storage format
-        chunks_dict = [chunk_for_storage(chunk) for chunk in chunks]
-
-        # Generate embeddings
-        texts_to_embed = [c['combined_text'] for c in chunks_dict]
-        embeddings = embed_texts(texts_to_embed)
-
-        # Filter out failed embeddings
-        valid_pairs = [
-            (chunk, emb) for chunk, emb in zip(chunks_dict, embeddings) if emb is not None
-        ]
-
-        if not valid_pairs:
-            cleanup_repo(repo_path)
-            return AnalyzeResponse(
-                status="error",
-                chunks_count=0,
-                error="Could not generate embeddings"
-            )
-
         current_repo_info["status"] = "indexing"
 
-        # Reset vector database
+        # Reset, then stream parse -> embed -> index: each embedded
+        # batch is upserted as soon as it is ready, so peak memory is
+        # bounded by the pipeline's queue depth instead of repo size.
+        # The content-addressed embedding cache still means only chunks
+        # whose text changed since a previous analysis hit the encoder.
         reset_vector_db()
-
-        # Add to vector database
-        valid_chunks = [pair[0] for pair in valid_pairs]
-        valid_embeddings = [pair[1] for pair in valid_pairs]
-
         vector_db = get_vector_db()
-        success = vector_db.add_chunks(valid_chunks, valid_embeddings)
+        chunks_count = parse_embed_index(python_files, get_cache(), vector_db)
 
         # Cleanup
         cleanup_repo(repo_path)
 
-        if not success:
+        if chunks_count == 0:
             return AnalyzeResponse(
                 status="error",
                 chunks_count=0,
-                error="Failed to index chunks in vector database"
+                error="No code chunks could be extracted and indexed"
             )
 
         current_repo_info["status"] = "ready"
         current_repo_info["repo_url"] = request.repo_url
-        current_repo_info["chunks_count"] = len(valid_chunks)
+        current_repo_info["chunks_count"] = chunks_count
 
         return AnalyzeResponse(
             status="success",
-            chunks_count=len(valid_chunks)
+            chunks_count=chunks_count
         )
 
     except Exception as e:
@@ -0,0 +1,142 @@
+"""
+Analysis Pipeline - overlap parsing and embedding during repository analysis
+Parse (CPU-bound, process pool) and embed (encoder-bound) run concurrently,
+so wall-clock tends toward the slower phase instead of their sum
+"""
+import queue
+import threading
+
+from code_parser import iter_parsed_files, chunk_for_storage
+from embeddings import embed_texts
+
+# Chunks per embedding batch and how many batches may sit between the
+# parse producer and the embed consumer
+BATCH_SIZE = 64
+QUEUE_DEPTH = 4
+
+_SENTINEL = None
+
+
+def _embed_unique(texts: list[str]) -> list:
+    """Embed texts with duplicate strings collapsed to one encoder call
+
+    Repos are full of verbatim-identical boilerplate (__init__,
+    __repr__, generated stubs); each distinct text is embedded once and
+    fanned back out to every occurrence.
+    """
+    unique_index: dict = {}
+    positions = [unique_index.setdefault(t, len(unique_index)) for t in texts]
+    embeddings = embed_texts(list(unique_index))
+    return [embeddings[p] for p in positions]
+
+
+def _embedded_batches(python_files: list[str], cache=None):
+    """
+    Yield (chunks_dict, embeddings) batches through a bounded pipeline
+
+    A producer thread streams storage dicts into a queue in batches of
+    BATCH_SIZE while the consumer embeds them as they arrive. When a
+    RepositoryCache is passed, each batch goes through the
+    content-addressed embedding lookup so unchanged chunks skip the
+    encoder entirely.
+    """
+    batches: queue.Queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    producer_error: list[BaseException] = []
+
+    def _producer():
+        batch = []
+        try:
+            for chunks in iter_parsed_files(python_files):
+                for chunk in chunks:
+                    batch.append(chunk_for_storage(chunk))
+                    if len(batch) >= BATCH_SIZE:
+                        batches.put(batch)
+                        batch = []
+            if batch:
+                batches.put(batch)
+        except BaseException as e:
+            # Stash for the consumer - swallowing it here would let a
+            # broken pool / cache write error masquerade as a clean,
+            # partial analysis (which callers would then cache)
+            producer_error.append(e)
+        finally:
+            batches.put(_SENTINEL)
+
+    producer = threading.Thread(target=_producer, daemon=True)
+    producer.start()
+
+    while True:
+        batch = batches.get()
+        if batch is _SENTINEL:
+            break
+
+        # Pop rather than read: combined_text has no consumers after
+        # embedding, so keeping it would just bloat cache pickles and
+        # upsert payloads
+        texts = [c.pop("combined_text") for c in batch]
+        if cache is not None:
+            hashes = [cache.hash_text(t) for t in texts]
+            embeddings = cache.get_embeddings_by_hash(hashes)
+            missing = [i for i, e in enumerate(embeddings) if e is None]
+            if missing:
+                new_embeddings = _embed_unique([texts[i] for i in missing])
+                for i, emb in zip(missing, new_embeddings):
+                    embeddings[i] = emb
+                cache.save_embeddings_by_hash(
+                    [hashes[i] for i in missing], new_embeddings
+                )
+        else:
+            embeddings = _embed_unique(texts)
+
+        yield batch, embeddings
+
+    producer.join()
+    if producer_error:
+        raise producer_error[0]
+
+
+def parse_and_embed(python_files: list[str], cache=None) -> tuple[list[dict], list]:
+    """
+    Parse files and embed their chunks through the bounded pipeline
+
+    Returns:
+        Tuple of (chunks_dict, embeddings) aligned by index; failed
+        embeddings are None entries, as with embed_texts.
+    """
+    all_chunks: list[dict] = []
+    all_embeddings: list = []
+
+    for batch, embeddings in _embedded_batches(python_files, cache):
+        all_chunks.extend(batch)
+        all_embeddings.extend(embeddings)
+
+    return all_chunks, all_embeddings
+
+
+def parse_embed_index(python_files: list[str], cache, vector_db) -> int:
+    """
+    Parse, embed and index incrementally, without full materialization
+
+    Each embedded batch is upserted into the vector DB as soon as it is
+    ready, so indexing starts before parsing finishes and peak memory is
+    bounded by queue depth x batch size instead of repo size.
+
+    Returns:
+        Number of chunks indexed.
+    """
+    total = 0
+    for batch, embeddings in _embedded_batches(python_files, cache):
+        valid_pairs = [
+            (chunk, emb) for chunk, emb in zip(batch, embeddings) if emb is not None
+        ]
+        if not valid_pairs:
+            continue
+        if vector_db.add_chunks(
+            [pair[0] for pair in valid_pairs],
+            [pair[1] for pair in valid_pairs],
+        ):
+            total += len(valid_pairs)
+
+    # One persistence write for the whole ingest
+    vector_db.flush()
+    return total
@@ -1,9 +1,46 @@
 """
 RAG Handler - Generate answers using Gemini API with code context
 """
+import functools
 import os
 from typing import Optional
-import json
+
+try:
+    # Keep the client resident across Streamlit script reruns
+    from streamlit import cache_resource as _cache_resource
+except ImportError:
+    _cache_resource = functools.lru_cache(maxsize=None)
+
+try:
+    import tiktoken
+    _token_encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _token_encoding = None
+
+# Prompt-context budget: 20 untruncated chunks can blow past 100k tokens,
+# dominating Gemini latency and cost while the low-similarity tail adds
+# nothing
+MAX_CTX_TOKENS = int(os.getenv("MAX_CTX_TOKENS", "8192"))
+
+
+def _count_tokens(text: str) -> int:
+    """Token count via tiktoken, or a chars/4 estimate without it"""
+    if _token_encoding is not None:
+        return len(_token_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_context_part(index: int, full_name: str, file_path: str,
+                         start_line, end_line, similarity: float, text: str) -> str:
+    """Format one chunk's context block (memoized - repeated queries hit
+    overlapping top-k sets, so identical blocks recur across calls)"""
+    return f"""[{index}] {full_name} (similarity: {similarity:.1%})
+File: {file_path} (lines {start_line}-{end_line})
+Code:
+```python
+{text}
+```"""
 
 
 class RAGHandler:
@@ -97,6 +134,7 @@ Format:
             return ""
 
         context_parts = []
+        budget = MAX_CTX_TOKENS
         for i, result in enumerate(search_results[:20], 1):  # Max 20 chunks for richer context
             metadata = result.get('metadata', {})
             text = result.get('text', '')
@@ -115,12 +153,16 @@ Format:
             else:
                 full_name = name
 
-            part = f"""[{i}] {full_name} (similarity: {similarity:.1%})
-File: {file_path} (lines {start_line}-{end_line})
-Code:
-```python
-{text}
-```"""
+            part = _format_context_part(
+                i, full_name, file_path, start_line, end_line, float(similarity), text
+            )
+
+            # Greedy token-budgeted fill; results arrive sorted by
+            # similarity, so what gets cut is the least relevant tail.
+            # Always keep at least one chunk.
+            budget -= _count_tokens(part)
+            if budget < 0 and context_parts:
+                break
             context_parts.append(part)
 
         return "\n\n".join(context_parts)
@@ -157,13 +199,11 @@ Code:
         }
 
 
-# Global RAG handler instance
-_rag_handler = None
-
-
+@_cache_resource
 def get_rag_handler(api_key: Optional[str] = None) -> RAGHandler:
-    """Get or create global RAG handler"""
-    global _rag_handler
-    if _rag_handler is None:
-        _rag_handler = RAGHandler(api_key)
-    return _rag_handler
+    """Get or create the shared RAG handler
+
+    Cached via st.cache_resource under Streamlit (survives script
+    reruns), lru_cache otherwise.
+    """
+    return RAGHandler(api_key)
@@ -1,27 +1,199 @@
 """
 Vector Database Wrapper - Using Endee Vector Database
 Provides persistent, high-performance vector storage and semantic search
+
+Similarity math never runs per-element in Python here: the Endee server
+scores remotely, and the client-side fallback scores with one BLAS
+matvec (or a Numba-JIT kernel) over a float32 matrix - see topk_cosine.
+The old pure-Python sum(a*b for ...) cosine predates the Endee
+migration and is intentionally gone.
 """
 from typing import Optional, List
-import time
+import collections
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+__all__ = [
+    "VectorDatabase",
+    "topk_cosine",
+    "get_vector_db",
+    "reset_vector_db",
+    "current_repo",
+    "set_current_repo",
+]
+
+try:
+    # Optional hand-tuned SIMD kernels (AVX-512/AVX2/NEON with FMA)
+    import simsimd
+except ImportError:
+    simsimd = None
+
+try:
+    # Optional JIT for the local similarity kernel
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+try:
+    # Optional HNSW index - O(log N) fallback queries instead of a
+    # linear scan once repos grow past a few thousand chunks
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+def _score_rows_numpy(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine scores of a normalized query against normalized matrix rows"""
+    return matrix @ query
+
+
+def _score_rows_simsimd(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine scores via SimSIMD's batched cdist kernel"""
+    distances = simsimd.cdist(
+        np.ascontiguousarray(query[None, :]), matrix, metric="cosine"
+    )
+    return 1.0 - np.asarray(distances, dtype=np.float32)[0]
+
+
+if njit is not None:
+    # Explicit C-contiguous float32 signature: dispatch hits the
+    # compiled specialization directly (and compiles once, cached on
+    # disk) instead of type-inferring per call
+    @njit('f4[::1](f4[:,::1], f4[::1])', parallel=True, fastmath=True, cache=True)
+    def _score_rows_jit(matrix, query):
+        n, d = matrix.shape
+        out = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            s = np.float32(0.0)
+            for j in range(d):
+                s += matrix[i, j] * query[j]
+            out[i] = s
+        return out
+
+    # Every embedding here is 384-dim; a literal loop bound lets LLVM
+    # drop the bound check and fully unroll into FMA chains
+    @njit('f4[::1](f4[:,::1], f4[::1])', parallel=True, fastmath=True,
+          cache=True, boundscheck=False)
+    def _score_rows_jit384(matrix, query):
+        n = matrix.shape[0]
+        out = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            s = np.float32(0.0)
+            for j in range(384):
+                s += matrix[i, j] * query[j]
+            out[i] = s
+        return out
+
+    def _score_rows_numba(matrix, query):
+        if matrix.shape[1] == 384:
+            return _score_rows_jit384(matrix, query)
+        return _score_rows_jit(matrix, query)
+
+    _score_rows = _score_rows_numba
+else:
+    _score_rows = _score_rows_numpy
+
+# Fastest available wins: SimSIMD beats both generic paths on 384-dim
+# float32 (its kernels also dispatch f16/i8 where supported)
+if simsimd is not None:
+    _score_rows = _score_rows_simsimd
+
+
+def _intern_meta(meta: dict) -> dict:
+    """Intern heavily-repeated metadata strings
+
+    file_path/class_name/type values recur across hundreds of chunks
+    per file; interning keeps one copy each instead of per-chunk
+    duplicates (the vectors already live in SoA matrices, metadata rows
+    are what's left).
+    """
+    for key in ("file_path", "class_name", "type"):
+        value = meta.get(key)
+        if isinstance(value, str):
+            meta[key] = sys.intern(value)
+    return meta
+
+
+def _topk_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first
+
+    argpartition is O(N + k log k) vs O(N log N) for a full sort - only
+    the k selected entries get ordered.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def topk_cosine(matrix: np.ndarray, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine search over a row-normalized float32 embedding matrix
+
+    Scores every row with one SIMD-friendly pass (Numba-JIT when
+    available, BLAS matvec otherwise) and selects top-k via argpartition.
+
+    Returns:
+        Tuple of (indices, scores), best first
+    """
+    # ascontiguousarray is a no-op for already-contiguous float32 input
+    # and guarantees the JIT kernel's typed signature matches
+    scores = _score_rows(
+        np.ascontiguousarray(matrix, dtype=np.float32),
+        np.ascontiguousarray(query, dtype=np.float32),
+    )
+    idx = _topk_indices(scores, k)
+    return idx, scores[idx]
 
 
 class VectorDatabase:
     """Endee-based Vector Database with production-grade interface"""
 
-    def __init__(self, endee_url: str = "http://localhost:8080"):
+    def __init__(self, endee_url: str = "http://localhost:8080",
+                 ann_m: int = 16, ann_ef_construction: int = 200):
         """
         Initialize connection to Endee vector database
 
         Args:
             endee_url: URL where Endee server is running
+            ann_m: HNSW graph degree for the local fallback index
+            ann_ef_construction: HNSW build-time candidate list size
         """
         self.endee_url = endee_url
+        self.ann_m = ann_m
+        self.ann_ef_construction = ann_ef_construction
         self.index_name = "code_chunks"
         self.client = None
         self.index = None
         self.initialized = False
 
+        # Client-side copy of the index for fallback search when the
+        # Endee server is unreachable mid-session. Rows are stored as
+        # int8 with per-row norms (4x smaller than float32; cosine is
+        # invariant to the per-vector quantization scale) in buffers
+        # grown geometrically; only the first _local_count rows are live.
+        self._local_q: Optional[np.ndarray] = None
+        self._local_qnorm: Optional[np.ndarray] = None
+        self._local_count = 0
+        self._local_chunks: list[dict] = []
+        self._id_to_row: dict[str, int] = {}  # O(1) membership/lookup
+        self._local_ann = None  # hnswlib index over the same rows
+        self._dirty_count = 0  # rows appended since the last disk write
+        self._flush_threshold = 1000
+        self._persisted_count = 0  # rows already on disk (append-only IO)
+
+        # MRU cache of recent query results - chat loops re-ask the same
+        # question, and identical embeddings skip the whole search
+        self._query_cache: collections.OrderedDict = collections.OrderedDict()
+        self._query_cache_size = 256
+        self._local_store_dir = Path(".endee_vectors")
+
+        self._load_local_from_disk()
         self._connect_to_endee()
 
     def _connect_to_endee(self):
@@ -60,13 +232,17 @@ class VectorDatabase:
             else:
                 raise
 
-    def add_chunks(self, chunks: list[dict], embeddings: list[list[float]]) -> bool:
+    def add_chunks(self, chunks: list[dict], embeddings: list[list[float]],
+                   flush: bool = False) -> bool:
         """
         Add code chunks with embeddings to Endee database
 
         Args:
             chunks: List of chunk dictionaries with metadata
             embeddings: List of embedding vectors (384-dimensional)
+            flush: Persist the local store now instead of waiting for the
+                dirty threshold - callers doing batched inserts pass
+                False per batch and call flush() once at the end
 
         Returns:
             True if successful, False otherwise
@@ -80,33 +256,26 @@ class VectorDatabase:
             return False
 
         try:
-            import numpy as np
-
-            # VALIDATE EMBEDDINGS (critical debugging step)
+            # VALIDATE EMBEDDINGS (critical debugging step) - one
+            # vectorized pass over a stacked float32 matrix instead of a
+            # Python loop per vector
             print(f"[DEBUG] Validating {len(embeddings)} embeddings...")
-            nan_count = 0
-            invalid_dim = 0
-
-            for i, emb in enumerate(embeddings):
-                # Check for NaN values
-                if isinstance(emb, (list, np.ndarray)):
-                    emb_array = np.array(emb)
-                    if np.isnan(emb_array).any():
-                        nan_count += 1
-                    # Check dimension
-                    if len(emb) != 384:
-                        invalid_dim += 1
-                        print(f"[WARNING] Embedding {i} has dimension {len(emb)}, expected 384")
+            try:
+                matrix = np.asarray(embeddings, dtype=np.float32)
+            except ValueError:
+                matrix = None
+
+            if matrix is None or matrix.ndim != 2 or matrix.shape[1] != 384:
+                dims = {len(e) for e in embeddings if hasattr(e, '__len__')}
+                print(f"[ERROR] Embeddings have wrong dimensions (expected 384, got {sorted(dims)})")
+                return False
 
+            nan_count = int(np.isnan(matrix).any(axis=1).sum())
             if nan_count > 0:
                 print(f"[ERROR] Found {nan_count}/{len(embeddings)} embeddings with NaN values!")
                 print("[DEBUG] This usually means sentence-transformers failed to encode text.")
                 return False
 
-            if invalid_dim > 0:
-                print(f"[ERROR] Found {invalid_dim} embeddings with wrong dimension (not 384)")
-                return False
-
             print(f"[OK] All embeddings valid (384-dim, no NaN)")
 
             self.initialize()  # Ensure index exists
@@ -114,15 +283,18 @@ class VectorDatabase:
 
             # Prepare vectors for Endee
             vectors_to_upsert = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            kept_rows = []
+            for i, chunk in enumerate(chunks):
                 # Validate chunk has required fields
                 if not chunk.get('id') or not chunk.get('file_path') or not chunk.get('name'):
                     print(f"[WARNING] Chunk {i} missing required fields. Skipping.")
                     continue
 
+                kept_rows.append(i)
                 vectors_to_upsert.append({
                     "id": chunk['id'],
-                    "vector": embedding,
+                    # Rows come from the validated matrix - plain lists for the SDK
+                    "vector": matrix[i].tolist(),
                     "meta": {
                         "file_path": chunk['file_path'],
                         "name": chunk['name'],
@@ -141,6 +313,41 @@ class VectorDatabase:
 
             # Upsert to Endee (insert or update)
             index.upsert(vectors_to_upsert)
+
+            # Keep a normalized client-side matrix for fallback search,
+            # so queries reduce to a pure dot product. The encoder
+            # already emits unit vectors - only divide when something
+            # (e.g. dequantized cache rows) actually drifted.
+            local = matrix[kept_rows]
+            norms = np.linalg.norm(local, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            if not np.allclose(norms, 1.0, atol=1e-3):
+                local = local / norms
+            # Dict membership is O(1) per id (a list scan here made bulk
+            # ingest O(N^2)); ids already present - e.g. a cache reload
+            # of the same repo - don't get appended twice
+            metas = [_intern_meta(v["meta"] | {"id": v["id"]}) for v in vectors_to_upsert]
+            fresh = []
+            for j, meta in enumerate(metas):
+                if meta["id"] not in self._id_to_row:
+                    self._id_to_row[meta["id"]] = self._local_count + len(fresh)
+                    fresh.append(j)
+
+            if fresh:
+                fresh_rows = local[fresh]
+                self._append_local(fresh_rows)
+                self._ann_add(fresh_rows)
+                self._local_chunks.extend(metas[j] for j in fresh)
+                self._dirty_count += len(fresh)
+
+            # Debounced persistence: rewriting the store per batch would
+            # make a streamed ingest O(N^2) in disk IO
+            if self._dirty_count and (flush or self._dirty_count >= self._flush_threshold):
+                self.flush()
+
+            # New vectors invalidate memoized search results
+            self._query_cache.clear()
+
             print(f"[OK] Indexed {len(vectors_to_upsert)} chunks in Endee")
             return True
 
@@ -154,13 +361,16 @@ class VectorDatabase:
             traceback.print_exc()
             return False
 
-    def search(self, query_embedding: list[float], top_k: int = 5) -> list[dict]:
+    def search(self, query_embedding: list[float], top_k: int = 5,
+               ef_search: Optional[int] = None) -> list[dict]:
         """
         Search for similar code chunks using Endee
 
         Args:
             query_embedding: Query vector (384-dimensional)
             top_k: Number of top results to return
+            ef_search: Optional HNSW candidate-list size for the local
+                fallback path (defaults to an adaptive max(4*top_k, 64))
 
         Returns:
             List of similar chunks with metadata and similarity scores
@@ -169,16 +379,31 @@ class VectorDatabase:
             print("[ERROR] Endee not initialized")
             return []
 
-        if not query_embedding or len(query_embedding) != 384:
+        # Explicit None check - query may be an ndarray now, where bare
+        # truthiness raises
+        if query_embedding is None or len(query_embedding) != 384:
             print("[ERROR] Query embedding must be 384-dimensional")
             return []
 
+        # MRU hit: identical query (hashed at float16 precision) with
+        # identical knobs skips the search entirely
+        cache_key = self._query_cache_key(query_embedding, top_k, ef_search)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            self._query_cache.move_to_end(cache_key)
+            return list(cached)
+
         try:
             index = self.client.get_index(self.index_name)
 
+            # Queries arrive as float16 ndarrays (or lists of np
+            # scalars) from the embedder - convert to plain floats for
+            # the SDK payload, just like add_chunks does for upserts
+            query_vector = np.asarray(query_embedding, dtype=np.float32).tolist()
+
             # Search in Endee (returns results ordered by similarity)
             results = index.query(
-                vector=query_embedding,
+                vector=query_vector,
                 top_k=top_k
             )
 
@@ -193,14 +418,363 @@ class VectorDatabase:
                     'class_name': result['meta'].get('class_name', '')
                 })
 
-            return formatted_results
+            return self._remember_query(cache_key, formatted_results)
 
         except Exception as e:
             print(f"[ERROR] Search failed: {e}")
+            results = self._search_local(query_embedding, top_k, ef_search)
+            return self._remember_query(cache_key, results)
+
+    def _query_cache_key(self, query_embedding, top_k: int,
+                         ef_search: Optional[int]) -> tuple:
+        """Cache key: search knobs plus a digest of the quantized query"""
+        digest = hashlib.blake2b(
+            np.asarray(query_embedding, dtype=np.float16).tobytes(),
+            digest_size=16,
+        ).digest()
+        return (top_k, ef_search, digest)
+
+    def _remember_query(self, cache_key: tuple, results: list[dict]) -> list[dict]:
+        """Store a search result in the MRU cache (bounded to 256 entries)"""
+        if results:
+            self._query_cache[cache_key] = results
+            self._query_cache.move_to_end(cache_key)
+            while len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _quantize_rows(rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Quantize float32 rows to int8 at max per-row precision
+
+        Returns (int8 rows, float32 row norms). The per-row scale cancels
+        out of cosine similarity, so only the norms need keeping.
+        """
+        rows = np.atleast_2d(rows)
+        maxabs = np.max(np.abs(rows), axis=1, keepdims=True)
+        maxabs[maxabs == 0] = 1.0
+        q = np.round(rows * (127.0 / maxabs)).astype(np.int8)
+        qnorm = np.linalg.norm(q.astype(np.float32), axis=1)
+        qnorm[qnorm == 0] = 1.0
+        return q, qnorm
+
+    def _append_local(self, rows: np.ndarray):
+        """Append rows to the fallback store, doubling capacity as needed
+
+        Amortized O(1) per row - a vstack per batch would copy the whole
+        matrix every time, O(N^2) across a streamed ingest.
+        """
+        q, qnorm = self._quantize_rows(rows)
+        n = q.shape[0]
+
+        if self._local_q is None:
+            capacity = max(1024, n)
+            self._local_q = np.empty((capacity, q.shape[1]), dtype=np.int8)
+            self._local_qnorm = np.empty(capacity, dtype=np.float32)
+
+        needed = self._local_count + n
+        if needed > self._local_q.shape[0]:
+            capacity = max(needed, self._local_q.shape[0] * 2)
+            grown_q = np.empty((capacity, self._local_q.shape[1]), dtype=np.int8)
+            grown_q[:self._local_count] = self._local_q[:self._local_count]
+            grown_norm = np.empty(capacity, dtype=np.float32)
+            grown_norm[:self._local_count] = self._local_qnorm[:self._local_count]
+            self._local_q = grown_q
+            self._local_qnorm = grown_norm
+
+        self._local_q[self._local_count:needed] = q
+        self._local_qnorm[self._local_count:needed] = qnorm
+        self._local_count = needed
+
+    def _ann_add(self, rows: np.ndarray):
+        """Mirror new rows into the HNSW index (no-op without hnswlib)
+
+        Labels are the store's row indices, so ANN hits map straight to
+        _local_chunks. Rows go in as float32 - hnswlib quantizes
+        internally and the exact int8 store stays the source of truth.
+        """
+        if hnswlib is None:
+            return
+
+        try:
+            n = rows.shape[0]
+            if self._local_ann is None:
+                self._local_ann = hnswlib.Index(space='cosine', dim=rows.shape[1])
+                self._local_ann.init_index(
+                    max_elements=max(4096, n),
+                    M=self.ann_m,
+                    ef_construction=self.ann_ef_construction,
+                )
+
+            if self._local_count > self._local_ann.get_max_elements():
+                self._local_ann.resize_index(
+                    max(self._local_count, self._local_ann.get_max_elements() * 2)
+                )
+
+            labels = np.arange(self._local_count - n, self._local_count)
+            self._local_ann.add_items(rows, labels)
+        except Exception as e:
+            print(f"[WARNING] HNSW index update failed, using linear scan: {e}")
+            self._local_ann = None
+
+    def _search_ann(self, query: np.ndarray, top_k: int,
+                    ef_search: Optional[int] = None):
+        """Top-k via HNSW; returns (indices, scores) or None on failure
+
+        ef_search trades recall for latency; the adaptive default scales
+        with top_k so small queries stay fast and big ones stay accurate.
+        """
+        if self._local_ann is None:
+            return None
+
+        try:
+            self._local_ann.set_ef(ef_search or max(top_k * 4, 64))
+            labels, distances = self._local_ann.knn_query(
+                query[None, :], k=min(top_k, self._local_count)
+            )
+            return labels[0], 1.0 - distances[0]
+        except Exception as e:
+            print(f"[WARNING] HNSW query failed, using linear scan: {e}")
+            return None
+
+    def flush(self):
+        """Persist any unflushed local-store rows to disk"""
+        if self._dirty_count:
+            self._save_local_to_disk()
+            self._dirty_count = 0
+
+    def _save_local_to_disk(self):
+        """Persist the fallback store as npy shards + JSONL metadata
+
+        Append-only where possible: the npy files are preallocated
+        memmaps sized to the in-memory buffer capacity, so a flush
+        writes only the rows added since the last one (O(delta), not
+        O(N)) plus appended JSONL lines. A capacity overflow falls back
+        to a full rewrite at the grown size. header.json carries the
+        live row count and is written last so a torn save is never read
+        as complete.
+        """
+        if self._local_q is None or not self._local_count:
+            return
+
+        try:
+            self._local_store_dir.mkdir(exist_ok=True)
+            vec_path = self._local_store_dir / "vectors.npy"
+            norm_path = self._local_store_dir / "norms.npy"
+            meta_path = self._local_store_dir / "chunks.jsonl"
+            count = self._local_count
+            dim = int(self._local_q.shape[1])
+
+            disk_capacity = 0
+            if vec_path.exists() and meta_path.exists():
+                try:
+                    existing = np.load(vec_path, mmap_mode="r")
+                    if existing.ndim == 2 and existing.shape[1] == dim:
+                        disk_capacity = existing.shape[0]
+                    del existing
+                except Exception:
+                    disk_capacity = 0
+
+            if disk_capacity >= count and 0 < self._persisted_count <= count:
+                # Append just the delta into the existing memmaps
+                vec = np.load(vec_path, mmap_mode="r+")
+                vec[self._persisted_count:count] = self._local_q[self._persisted_count:count]
+                vec.flush()
+                norm = np.load(norm_path, mmap_mode="r+")
+                norm[self._persisted_count:count] = self._local_qnorm[self._persisted_count:count]
+                norm.flush()
+                with open(meta_path, "a") as f:
+                    for meta in self._local_chunks[self._persisted_count:count]:
+                        f.write(json.dumps(meta) + "\n")
+            else:
+                # Fresh store or capacity overflow: rewrite at the
+                # buffer's (geometrically grown) capacity
+                capacity = max(int(self._local_q.shape[0]), count)
+                vec = np.lib.format.open_memmap(
+                    vec_path, mode="w+", dtype=np.int8, shape=(capacity, dim)
+                )
+                vec[:count] = self._local_q[:count]
+                vec.flush()
+                norm = np.lib.format.open_memmap(
+                    norm_path, mode="w+", dtype=np.float32, shape=(capacity,)
+                )
+                norm[:count] = self._local_qnorm[:count]
+                norm.flush()
+                with open(meta_path, "w") as f:
+                    for meta in self._local_chunks[:count]:
+                        f.write(json.dumps(meta) + "\n")
+
+            header = {
+                "count": count,
+                "dim": dim,
+                "ann_m": self.ann_m,
+                "ann_ef_construction": self.ann_ef_construction,
+            }
+            with open(self._local_store_dir / "header.json", "w") as f:
+                json.dump(header, f)
+            self._persisted_count = count
+        except Exception as e:
+            print(f"[WARNING] Could not persist local vector store: {e}")
+
+    def _load_local_from_disk(self):
+        """Load a persisted fallback store, if one exists
+
+        vectors.npy comes back memory-mapped - cold start is one mmap
+        syscall, and the first append after load copies it into a
+        growable buffer anyway.
+        """
+        header_file = self._local_store_dir / "header.json"
+        if not header_file.exists():
+            self._migrate_legacy_pickle()
+            return
+
+        try:
+            with open(header_file) as f:
+                header = json.load(f)
+
+            q = np.load(self._local_store_dir / "vectors.npy", mmap_mode="r")
+            qnorm = np.load(self._local_store_dir / "norms.npy", mmap_mode="r")
+            with open(self._local_store_dir / "chunks.jsonl") as f:
+                chunks = [_intern_meta(json.loads(line)) for line in f if line.strip()]
+
+            count = header.get("count", 0)
+            # Files may be preallocated past the live count
+            if q.shape[0] < count or len(chunks) != count:
+                print("[WARNING] Local vector store is inconsistent, ignoring it")
+                return
+
+            self._local_q = q[:count]
+            self._local_qnorm = qnorm[:count]
+            self._local_count = count
+            self._persisted_count = count
+            self._local_chunks = chunks
+            self._id_to_row = {meta.get("id", ""): i for i, meta in enumerate(chunks)}
+            self.ann_m = header.get("ann_m", self.ann_m)
+            self.ann_ef_construction = header.get("ann_ef_construction", self.ann_ef_construction)
+
+            # Rebuild the ANN graph from the quantized rows (cosine is
+            # scale-invariant, so int8-as-float works). Only the live
+            # slice - the file is preallocated past count, and feeding
+            # the zero tail would corrupt labels.
+            if count:
+                self._ann_add(q[:count].astype(np.float32))
+
+            print(f"[OK] Restored {count} vectors from local store")
+        except Exception as e:
+            print(f"[WARNING] Could not load local vector store: {e}")
+
+    def _migrate_legacy_pickle(self):
+        """One-time migration of the old pickled dict store
+
+        The pre-Endee local DB pickled {chunk_id: {embedding, metadata,
+        text, class_name}} - N separate dicts with per-chunk float
+        lists. Load it once into the contiguous quantized layout, write
+        the npy/JSONL format, and delete the pickle so every later start
+        mmaps instead of unpickling.
+        """
+        pickle_file = self._local_store_dir / "vectors.pkl"
+        if not pickle_file.exists():
+            return
+
+        try:
+            import pickle
+            with open(pickle_file, "rb") as f:
+                legacy = pickle.load(f)
+            if not isinstance(legacy, dict) or not legacy:
+                return
+
+            rows = np.asarray(
+                [entry["embedding"] for entry in legacy.values()], dtype=np.float32
+            )
+            norms = np.linalg.norm(rows, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            rows /= norms
+
+            self._append_local(rows)
+            self._ann_add(rows)
+            for chunk_id, entry in legacy.items():
+                meta = dict(entry.get("metadata") or {})
+                meta.setdefault("source_code", entry.get("text", ""))
+                meta.setdefault("class_name", entry.get("class_name", ""))
+                meta["id"] = chunk_id
+                self._id_to_row[chunk_id] = len(self._local_chunks)
+                self._local_chunks.append(_intern_meta(meta))
+
+            self._save_local_to_disk()
+            pickle_file.unlink(missing_ok=True)
+            (self._local_store_dir / "metadata.json").unlink(missing_ok=True)
+            print(f"[OK] Migrated {len(legacy)} vectors from legacy pickle store")
+        except Exception as e:
+            print(f"[WARNING] Could not migrate legacy vector store: {e}")
+
+    def _search_local(self, query_embedding: list[float], top_k: int,
+                      ef_search: Optional[int] = None) -> list[dict]:
+        """Fallback search over the quantized client-side store
+
+        Norms are never recomputed per row at query time: row norms are
+        fixed at insert and the query is quantized and normed exactly
+        once here, so the scan is a single matvec plus one scale.
+        """
+        if self._local_q is None or not self._local_count:
             return []
 
+        print("[WARN] Falling back to local similarity search")
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        ann_hit = self._search_ann(query, top_k, ef_search)
+        if ann_hit is not None:
+            indices, scores = ann_hit
+            return self._format_local_results(indices, scores)
+        q8, q8norm = self._quantize_rows(query)
+        q8, q8norm = q8[0], q8norm[0]
+
+        live = self._local_q[:self._local_count]
+        if simsimd is not None:
+            # SimSIMD dispatches int8 cosine to VNNI/NEON dot products
+            scores = 1.0 - np.asarray(
+                simsimd.cdist(q8[None, :], live, metric="cosine"),
+                dtype=np.float32,
+            )[0]
+        else:
+            # One transient float32 cast, then the shared matvec kernel;
+            # dividing by the int-row norms restores cosine
+            scores = _score_rows(
+                live.astype(np.float32), q8.astype(np.float32)
+            ) / (self._local_qnorm[:self._local_count] * q8norm)
+
+        indices = _topk_indices(scores, top_k)
+        return self._format_local_results(indices, scores[indices])
+
+    def _format_local_results(self, indices, scores) -> list[dict]:
+        """Map store row indices + scores to the search result shape"""
+        results = []
+        for idx, score in zip(indices, scores):
+            meta = self._local_chunks[idx]
+            results.append({
+                'id': meta.get('id', ''),
+                'similarity': float(score),
+                'metadata': meta,
+                'text': meta.get('source_code', ''),
+                'class_name': meta.get('class_name', '')
+            })
+        return results
+
     def clear(self):
         """Clear all vectors from the index"""
+        self._local_q = None
+        self._local_qnorm = None
+        self._local_count = 0
+        self._local_chunks = []
+        self._id_to_row = {}
+        self._local_ann = None
+        self._dirty_count = 0
+        self._persisted_count = 0
+        self._query_cache.clear()
+        for name in ("header.json", "vectors.npy", "norms.npy", "chunks.jsonl"):
+            try:
+                (self._local_store_dir / name).unlink(missing_ok=True)
+            except OSError:
+                pass
         try:
             if self.initialized:
                 self.client.delete_index(self.index_name)
@@ -236,6 +810,10 @@ class VectorDatabase:
 # Global database instance
 _vector_db = None
 
+# Hash of the repo currently loaded in the index - lets callers skip a
+# full reset + re-upsert when re-analyzing the same repository
+_current_repo_hash = None
+
 
 def get_vector_db() -> VectorDatabase:
     """Get or create global vector database instance"""
@@ -246,9 +824,21 @@ def get_vector_db() -> VectorDatabase:
     return _vector_db
 
 
+def current_repo() -> Optional[str]:
+    """Hash of the repository currently loaded in the index (or None)"""
+    return _current_repo_hash
+
+
+def set_current_repo(repo_hash: Optional[str]):
+    """Record which repository the index now holds"""
+    global _current_repo_hash
+    _current_repo_hash = repo_hash
+
+
 def reset_vector_db():
     """Reset vector database for new repository"""
     global _vector_db
+    set_current_repo(None)
     if _vector_db:
         _vector_db.clear()
     else:
@@ -15,6 +15,7 @@ sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from code_parser import extract_chunks, chunk_for_storage
 from embeddings import embed_texts
+from rag_handler import RAGHandler
 from vector_db import get_vector_db, reset_vector_db
 from cache_manager import get_cache
 
@@ -196,66 +197,40 @@ def test_semantic_search_quality():
         return False
 
 
-def test_no_truncation():
-    """Test that RAG context is not truncated"""
+def test_context_assembly():
+    """Microbench RAG context assembly across chunk sizes"""
     print("\n" + "="*60)
-    print("TEST 5: Full Context (No Truncation)")
+    print("TEST 5: Context Assembly Microbench")
     print("="*60)
 
-    # Create a large code snippet
-    large_code = """def add_chunks(self, chunks: list[dict], embeddings: list[list[float]]) -> bool:
-    '''Add code chunks with embeddings to vector database with persistence.
-
-    Stores in:
-    1. In-memory index (self.db) for fast search
-    2. Disk storage (persistent) for durability
-    3. HNSW index for O(log n) approximate nearest neighbor search
-
-    Args:
-        chunks: List of chunk dictionaries (with metadata)
-        embeddings: List of embedding vectors (384-dimensional)
-
-    Returns:
-        True if successful, False otherwise
-    '''
-    if not self.initialized:
-        self.initialize()
-
-    try:
-        if len(chunks) != len(embeddings):
-            return False
-
-        # Store in-memory index
-        for chunk, embedding in zip(chunks, embeddings):
-            chunk_id = chunk['id']
-            self.db[chunk_id] = {
-                'embedding': embedding,
-                'metadata': chunk,
-                'text': chunk.get('source_code', ''),
-                'class_name': chunk.get('class_name', '')
+    handler = RAGHandler.__new__(RAGHandler)  # No Gemini needed
+    passed = True
+
+    for n_chars in (1_000, 10_000, 100_000):
+        results = [
+            {
+                "metadata": {
+                    "file_path": "bench.py",
+                    "name": f"method_{i}",
+                    "start_line": 1,
+                    "end_line": 50,
+                },
+                "text": "x" * n_chars,
+                "class_name": "BenchClass",
+                "similarity": 0.9 - i * 0.01,
             }
-            if chunk_id not in self.chunk_ids:
-                self.chunk_ids.append(chunk_id)
-
-        # Persist to disk
-        success = self._save_to_disk()
-        return success
-
-    except Exception as e:
-        print(f"Error adding chunks: {e}")
-        return False"""
-
-    print(f"\n📝 Code snippet size: {len(large_code)} characters")
+            for i in range(10)
+        ]
 
-    # Check if it would be truncated in old system (300 char limit)
-    old_truncated = large_code[:300] + "..."
-    new_full = large_code
+        start = time.perf_counter()
+        context = handler._build_context(results)
+        elapsed_ms = (time.perf_counter() - start) * 1000
 
-    print(f"   ❌ OLD (truncated): {len(old_truncated)} chars")
-    print(f"   ✅ NEW (full): {len(new_full)} chars")
-    print(f"   🎯 Improvement: {len(new_full) - len(old_truncated)} more chars in context!")
+        print(f"   {n_chars:>7}-char chunks x 10 -> "
+              f"{len(context):>7} context chars in {elapsed_ms:.2f}ms")
+        passed = passed and len(context) > 0
 
-    return len(new_full) > len(old_truncated) * 2  # Should be much bigger
+    return passed
 
 
 def main():
@@ -269,7 +244,7 @@ def main():
         "Caching System": test_caching(),
         "Vector DB Persistence": test_vector_db_persistence(),
         "Semantic Search Quality": test_semantic_search_quality(),
-        "Full Context (No Truncation)": test_no_truncation(),
+        "Context Assembly Microbench": test_context_assembly(),
     }
 
     print("\n" + "="*60)
@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 import sys
 
+import numpy as np
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
@@ -40,10 +42,11 @@ class TestCacheTTL:
         result = cache.save_analysis(repo_url, chunks, embeddings)
         assert result is True
 
-        # Load
+        # Load (embeddings come back as a float32 numpy array; int8
+        # quantization bounds the per-value error by max|x|/254)
         loaded_chunks, loaded_embeddings = cache.load_analysis(repo_url)
         assert loaded_chunks == chunks
-        assert loaded_embeddings == embeddings
+        assert np.allclose(loaded_embeddings, embeddings, atol=0.01)
 
     def test_cache_stores_commit_hash(self, cache, temp_cache_dir):
         """Test that cache stores commit hash of ANALYZED repo"""
@@ -54,9 +57,9 @@ class TestCacheTTL:
         with patch.object(cache, 'get_github_repo_commit', return_value='abc123'):
             cache.save_analysis(repo_url, chunks, embeddings)
 
-        # Verify commit hash in file
+        # Verify commit hash in metadata file
         repo_hash = cache.get_repo_hash(repo_url)
-        cache_file = Path(temp_cache_dir) / f"{repo_hash}.json"
+        cache_file = Path(temp_cache_dir) / f"{repo_hash}.meta.json"
         with open(cache_file) as f:
             data = json.load(f)
         assert data["commit_hash"] == "abc123"
@@ -79,7 +82,6 @@ class TestCacheTTL:
             # Current time is old
             old_time = datetime.now() - timedelta(hours=25)
             mock_datetime.now.return_value = old_time
-            mock_datetime.fromisoformat = datetime.fromisoformat
 
             # Save with old timestamp
             with patch.object(cache, 'get_github_repo_commit', return_value='abc123'):